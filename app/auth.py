@@ -1,20 +1,17 @@
 from fastapi import APIRouter, Form, Request, Depends
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
 from starlette.status import HTTP_302_FOUND
 from passlib.hash import bcrypt
 from app.models import User, PasswordResetToken
-from app.database import get_session,engine
-from passlib.hash import bcrypt
-from dotenv import load_dotenv
+from app.database import get_session
+from app.templating import templates
+import app.config  # noqa: F401
 import os, secrets, smtplib
 from email.message import EmailMessage
 from datetime import datetime, timedelta
 
-load_dotenv()
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 MAIL_SERVER = os.getenv("MAIL_SERVER")
 MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
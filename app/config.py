@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Carga única del .env: el resto de módulos importan este antes de leer os.getenv
+load_dotenv()
@@ -1,13 +1,41 @@
+import os
+from typing import Optional
+
+from sqlalchemy.engine import Engine
 from sqlmodel import SQLModel, create_engine, Session
 
-sqlite_file_name = "database.db"
+import app.config  # noqa: F401
+
+sqlite_file_name = os.getenv("SQLITE_FILE", "database.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
+DB_ECHO = os.getenv("DB_ECHO", "true").lower() == "true"
+
+# El engine se crea bajo demanda dentro de cada proceso (después del fork),
+# nunca al importar el módulo.
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+
+def get_engine() -> Engine:
+    global _engine, _engine_pid
+    if _engine is not None and _engine_pid != os.getpid():
+        # Heredado del proceso padre: no reutilizar sus conexiones
+        _engine.dispose(close=False)
+        _engine = None
+    if _engine is None:
+        _engine = create_engine(sqlite_url, echo=DB_ECHO)
+        _engine_pid = os.getpid()
+    return _engine
 
-engine = create_engine(sqlite_url, echo=True)
+def dispose_engine():
+    global _engine, _engine_pid
+    if _engine is not None:
+        _engine.dispose()
+    _engine = None
+    _engine_pid = None
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
@@ -0,0 +1,168 @@
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from app.database import get_engine
+from app.models import Prompt
+from app import tokens
+
+# Filas por transacción al importar / por lote al leer en la exportación
+BATCH_SIZE = 500
+# Máximo de errores detallados que se devuelven (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 200
+
+EXPORT_COLUMNS = ("id", "title", "description", "template", "field_types")
+# Tipos soportados por el formulario de plantillas
+FIELD_TYPES = ("text", "number", "checkbox", "date")
+
+
+# ---------------------- EXPORTAR ----------------------
+def export_prompts_jsonl(user_id: int) -> Iterator[str]:
+    # Sesión propia: el generador se consume después de cerrar la del request.
+    # yield_per mantiene la memoria constante aunque haya miles de prompts.
+    with Session(get_engine()) as session:
+        stmt = (
+            select(Prompt.id, Prompt.title, Prompt.description, Prompt.template, Prompt.field_types)
+            .where(Prompt.owner_id == user_id)
+            .order_by(Prompt.id)
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        for row in session.exec(stmt):
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["field_types"] = record["field_types"] or {}
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# ---------------------- IMPORTAR ----------------------
+def parse_row(line: str) -> Tuple[Optional[Dict], Optional[str]]:
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        return None, f"JSON inválido ({e.msg})"
+    if not isinstance(data, dict):
+        return None, "cada línea debe ser un objeto JSON"
+
+    title = data.get("title")
+    template = data.get("template")
+    description = data.get("description") or ""
+    field_types = data.get("field_types") or {}
+    prompt_id = data.get("id")
+
+    if not isinstance(title, str) or not title.strip():
+        return None, "falta 'title'"
+    if not isinstance(template, str) or not template.strip():
+        return None, "falta 'template'"
+    if not isinstance(description, str):
+        return None, "'description' debe ser texto"
+    if prompt_id is not None and (isinstance(prompt_id, bool) or not isinstance(prompt_id, int)):
+        return None, "'id' debe ser un entero"
+    if not isinstance(field_types, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) and v for k, v in field_types.items()
+    ):
+        return None, "'field_types' debe ser un objeto {campo: tipo}"
+
+    # Se acepta el nombre tal cual (lo que usan fill_prompt_form y process_prompt)
+    # o recortado (lo que guarda el formulario de crear/editar y, por tanto, la exportación)
+    campos = set(tokens.template_fields(template))
+    if any(not campo.strip() for campo in campos):
+        return None, "la plantilla contiene un marcador vacío {{}}"
+    invalidos = sorted({v for v in field_types.values() if v not in FIELD_TYPES})
+    if invalidos:
+        return None, f"tipos no soportados: {', '.join(invalidos)}"
+    desconocidos = sorted(set(field_types) - campos - {campo.strip() for campo in campos})
+    if desconocidos:
+        return None, f"field_types sin marcador en la plantilla: {', '.join(desconocidos)}"
+
+    return {
+        "id": prompt_id,
+        "title": title.strip(),
+        "description": description,
+        "template": template,
+        "field_types": field_types,
+    }, None
+
+
+def _flush_batch(session: Session, user_id: int, batch: List[Dict]) -> Tuple[int, int]:
+    # Upsert de un lote en una sola transacción: una consulta para localizar
+    # los existentes y un executemany para inserts y otro para updates.
+    ids = {row["id"] for row in batch if row["id"] is not None}
+    titles = {row["title"] for row in batch}
+    existing = session.exec(
+        select(Prompt.id, Prompt.title)
+        .where(Prompt.owner_id == user_id)
+        .where(Prompt.id.in_(ids) | Prompt.title.in_(titles))
+        .order_by(Prompt.id)
+    ).all()
+    own_ids = {pid for pid, _ in existing}
+    # El título no es único: si hay varios, se actualiza el más antiguo (menor id)
+    id_by_title: Dict[str, int] = {}
+    for pid, title in existing:
+        id_by_title.setdefault(title, pid)
+
+    now = datetime.utcnow()
+    updates: Dict[int, Dict] = {}
+    inserts: Dict[str, Dict] = {}
+    for row in batch:
+        values = {
+            "title": row["title"],
+            "description": row["description"],
+            "template": row["template"],
+            "field_types": row["field_types"],
+            "updated_at": now,
+        }
+        target = row["id"] if row["id"] in own_ids else id_by_title.get(row["title"])
+        if target is not None:
+            updates[target] = {"id": target, **values}
+        else:
+            # Títulos repetidos dentro del lote: gana la última fila
+            inserts[row["title"]] = {
+                **values,
+                "owner_id": user_id,
+                "rating_count": 0,
+                "created_at": now,
+            }
+
+    if inserts:
+        session.execute(insert(Prompt), list(inserts.values()))
+    if updates:
+        session.execute(update(Prompt), list(updates.values()))
+    session.commit()
+    return len(inserts), len(updates)
+
+
+def import_prompts_jsonl(session: Session, user_id: int, lines: Iterable[bytes]) -> Dict:
+    report = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+    batch: List[Dict] = []
+
+    def flush():
+        created, updated = _flush_batch(session, user_id, batch)
+        report["created"] += created
+        report["updated"] += updated
+        batch.clear()
+
+    for lineno, raw in enumerate(lines, start=1):
+        try:
+            line = raw.decode("utf-8").strip() if isinstance(raw, bytes) else raw.strip()
+        except UnicodeDecodeError:
+            line, error = None, "codificación no UTF-8"
+        else:
+            if not line:
+                continue
+            row, error = parse_row(line)
+
+        if error:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": lineno, "error": error})
+            continue
+
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    if batch:
+        flush()
+    return report
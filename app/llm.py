@@ -0,0 +1,24 @@
+import os
+from typing import Optional
+
+import app.config  # noqa: F401
+
+_client = None
+_client_pid: Optional[int] = None
+
+def get_client():
+    # Import perezoso: el SDK de openai es lo más lento de cargar de la app.
+    # El cliente (y su pool HTTP) se crea en cada worker, nunca antes del fork.
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        from openai import OpenAI
+        _client = OpenAI()
+        _client_pid = os.getpid()
+    return _client
+
+def close_client():
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
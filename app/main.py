@@ -1,24 +1,55 @@
-from fastapi import FastAPI, Request
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from app.database import create_db_and_tables
+from app.database import create_db_and_tables, dispose_engine, get_engine
+from app.templating import templates
 from app import auth
 from app import prompts
+from app import llm
 
-app = FastAPI()
-templates = Jinja2Templates(directory="app/templates")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-app.include_router(auth.router)
-app.include_router(prompts.router)
-
-@app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+router = APIRouter()
 
-@app.get("/")
+@router.get("/")
 def index(request: Request):
     user_id = request.cookies.get("user_id")
     return templates.TemplateResponse("index.html", {"request": request, "user_id": user_id})
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Se ejecuta en cada worker, ya después del fork: aquí se crean los recursos
+    # que no se pueden compartir entre procesos (engine, cliente HTTP del LLM).
+    get_engine()
+    # En modo preload las tablas ya las crea el proceso maestro (ver gunicorn.conf.py)
+    if os.getenv("DB_CREATE_TABLES", "true").lower() == "true":
+        create_db_and_tables()
+    yield
+    llm.close_client()
+    dispose_engine()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+
+    app.include_router(auth.router)
+    app.include_router(prompts.router)
+    app.include_router(router)
+    return app
+
+
+def preload():
+    # Trabajo de arranque que se hace una sola vez en el proceso maestro antes
+    # del fork: crear tablas y cargar los módulos pesados para que los workers
+    # los hereden ya en memoria. No deja conexiones ni clientes abiertos.
+    create_db_and_tables()
+    dispose_engine()
+    import openai  # noqa: F401
+    from app import tokens
+    tokens._get_encoder()
+
+
+# Compatibilidad con `uvicorn app.main:app`; también vale `uvicorn app.main:create_app --factory`
+app = create_app()
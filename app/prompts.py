@@ -1,18 +1,14 @@
-from fastapi import APIRouter, Request, Form, Depends
+from fastapi import APIRouter, Request, Form, Depends, File, UploadFile
 from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse
 from sqlmodel import Session, select
 from starlette.status import HTTP_302_FOUND
 import json
 from app.models import Prompt, PromptInteraction
-from app.database import get_session, engine
-from fastapi.templating import Jinja2Templates
+from app.database import get_session
+from app import tokens, library, llm
+from app.templating import templates
 from sqlalchemy import desc, nullsfirst, nullslast, text, asc
 from sqlalchemy.orm import selectinload
-import openai
-import os
-import re
-from openai import OpenAI
-from dotenv import load_dotenv
 import csv
 from io import StringIO
 from typing import List, Optional
@@ -20,10 +16,6 @@ from datetime import datetime, timedelta
 OFFSET = timedelta(hours=2)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
-
-load_dotenv()
-client = OpenAI()
 
 def require_login(request: Request):
     user_id = request.cookies.get("user_id")
@@ -108,6 +100,37 @@ def create_prompt(
     session.commit()
     return RedirectResponse("/prompts", status_code=HTTP_302_FOUND)
 
+@router.get("/prompts/export")
+def export_prompts(request: Request):
+    user_id = require_login(request)
+    if isinstance(user_id, RedirectResponse):
+        return user_id
+
+    return StreamingResponse(library.export_prompts_jsonl(user_id), media_type="application/x-ndjson", headers={
+        "Content-Disposition": "attachment; filename=prompts.jsonl"
+    })
+
+@router.get("/prompts/import")
+def import_prompts_form(request: Request):
+    user_id = require_login(request)
+    if isinstance(user_id, RedirectResponse):
+        return user_id
+    return templates.TemplateResponse("prompts/import.html", {"request": request})
+
+@router.post("/prompts/import")
+def import_prompts(
+    request: Request,
+    file: UploadFile = File(...),
+    session: Session = Depends(get_session)
+):
+    user_id = require_login(request)
+    if isinstance(user_id, RedirectResponse):
+        return user_id
+
+    # Se lee línea a línea del fichero subido: memoria constante
+    report = library.import_prompts_jsonl(session, user_id, file.file)
+    return templates.TemplateResponse("prompts/import.html", {"request": request, "report": report})
+
 @router.get("/prompts/{prompt_id}/edit")
 def edit_prompt_form(prompt_id: int, request: Request, session: Session = Depends(get_session)):
     prompt = session.get(Prompt, prompt_id)
@@ -160,8 +183,33 @@ def view_prompt(prompt_id: int, request: Request, session: Session = Depends(get
 @router.get("/prompts/{prompt_id}/fill")
 def fill_prompt_form(prompt_id: int, request: Request, session: Session = Depends(get_session)):
     prompt = session.get(Prompt, prompt_id)
-    campos = re.findall(r"\{\{(.*?)\}\}", prompt.template)
-    return templates.TemplateResponse("prompts/fill.html", {"request": request, "prompt": prompt, "campos": campos})
+    campos = tokens.template_fields(prompt.template)
+    estimacion = tokens.estimate(prompt.template, {})
+    return templates.TemplateResponse("prompts/fill.html", {
+        "request": request,
+        "prompt": prompt,
+        "campos": campos,
+        "estimacion": estimacion
+    })
+
+@router.post("/prompts/{prompt_id}/estimate")
+async def estimate_prompt(
+    prompt_id: int,
+    request: Request,
+    session: Session = Depends(get_session)
+):
+    # Estimación local de tokens/coste para el formulario (sin llamar al LLM)
+    user_id = require_login(request)
+    if isinstance(user_id, RedirectResponse):
+        return JSONResponse({"ok": False, "error": "No autenticado"}, status_code=401)
+
+    prompt = session.get(Prompt, prompt_id)
+    if not prompt:
+        return JSONResponse({"ok": False, "error": "Prompt no encontrado"}, status_code=404)
+
+    form_data = await request.form()
+    valores = {k: str(v) for k, v in form_data.items()}
+    return JSONResponse({"ok": True, **tokens.estimate(prompt.template, valores)})
 
 @router.post("/prompts/{prompt_id}/fill")
 async def process_prompt(
@@ -194,24 +242,32 @@ async def process_prompt(
             except ValueError:
                 errores.append(f"El campo '{key}' debe ser una fecha válida (YYYY-MM-DD).")
 
+    # Comprobación previa de tamaño antes de llamar al LLM
+    if not errores:
+        template, estimacion = tokens.prepare_request(template, valores)
+        if estimacion["over_limit"]:
+            errores.append(
+                f"El prompt ocupa {estimacion['input_tokens']} tokens y supera el "
+                f"límite de {estimacion['max_input_tokens']}. Reduce el texto de los campos."
+            )
+    else:
+        estimacion = tokens.estimate(template, valores)
+
     if errores:
-        import re
-        campos = re.findall(r"\{\{(.*?)\}\}", template)
+        campos = tokens.template_fields(prompt.template)
         return templates.TemplateResponse("prompts/fill.html", {
             "request": request,
             "prompt": prompt,
             "campos": campos,
             "errores": errores,
-            "valores": valores
+            "valores": valores,
+            "estimacion": estimacion
         })
 
-    for key, value in valores.items():
-        template = template.replace(f"{{{{{key}}}}}", value)
-
-    client = OpenAI()
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": template}]
+    response = llm.get_client().chat.completions.create(
+        model=tokens.LLM_MODEL,
+        messages=[{"role": "user", "content": template}],
+        **tokens.request_max_tokens(estimacion)
     )
     respuesta = response.choices[0].message.content
     
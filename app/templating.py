@@ -0,0 +1,4 @@
+from fastapi.templating import Jinja2Templates
+
+# Un único entorno Jinja compartido por todos los routers
+templates = Jinja2Templates(directory="app/templates")
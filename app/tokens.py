@@ -0,0 +1,180 @@
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import app.config  # noqa: F401
+
+# Modelo y límites (configurables por entorno)
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "128000"))
+# Límite de salida del propio modelo (gpt-4o: 16384)
+MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "16384"))
+MIN_OUTPUT_TOKENS = int(os.getenv("LLM_MIN_OUTPUT_TOKENS", "256"))
+MAX_INPUT_TOKENS = int(os.getenv("LLM_MAX_INPUT_TOKENS", str(CONTEXT_WINDOW - MIN_OUTPUT_TOKENS)))
+# "reject" => no se llama al LLM si se supera el límite; "truncate" => se recorta la entrada
+OVERFLOW_POLICY = os.getenv("LLM_OVERFLOW_POLICY", "reject").lower()
+
+# Precios en USD por millón de tokens (gpt-4o por defecto)
+PRICE_INPUT_PER_M = float(os.getenv("LLM_PRICE_INPUT_PER_M", "2.50"))
+PRICE_OUTPUT_PER_M = float(os.getenv("LLM_PRICE_OUTPUT_PER_M", "10.00"))
+
+# Tokens extra que añade el formato chat (cabecera del mensaje + cebado de la respuesta)
+MESSAGE_OVERHEAD_TOKENS = 7
+
+PLACEHOLDER_RE = re.compile(r"\{\{(.*?)\}\}")
+
+# Aproximación cuando tiktoken no está disponible
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    # tiktoken es opcional: si no está instalado usamos la aproximación por caracteres.
+    # La primera vez tiktoken descarga el fichero BPE de la codificación; para que
+    # funcione sin red hay que precargarlo en TIKTOKEN_CACHE_DIR (se puede poner en .env):
+    #   TIKTOKEN_CACHE_DIR=/ruta python -c "import tiktoken; tiktoken.get_encoding('o200k_base')"
+    # Si la carga falla (sin red, caché corrupta...) el None queda cacheado y no se
+    # reintenta en cada petición.
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(LLM_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"[TOKENS] No se pudo cargar la codificación de tiktoken, se usa la aproximación: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, limit: int) -> str:
+    if limit <= 0:
+        return ""
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[: limit * CHARS_PER_TOKEN]
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= limit:
+        return text
+    return encoder.decode(tokens[:limit])
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str) -> Tuple[int, Tuple[str, ...]]:
+    # Cacheado por el texto de la plantilla: al editar un Prompt cambia la clave
+    # y la entrada antigua acaba saliendo del LRU.
+    campos = tuple(PLACEHOLDER_RE.findall(template))
+    static_parts = PLACEHOLDER_RE.split(template)[::2]
+    static_tokens = sum(count_tokens(part) for part in static_parts)
+    return static_tokens, campos
+
+
+def template_fields(template: str) -> List[str]:
+    return list(compile_template(template)[1])
+
+
+def fill_template(template: str, valores: Dict[str, str]) -> str:
+    for key, value in valores.items():
+        template = template.replace(f"{{{{{key}}}}}", value)
+    return template
+
+
+def _fixed_tokens(template: str, valores: Dict[str, str]) -> int:
+    # Lo que no se puede recortar: texto de la plantilla (cacheado), cabecera del
+    # mensaje y marcadores sin valor, que se quedan tal cual en el texto final.
+    static_tokens, campos = compile_template(template)
+    total = static_tokens + MESSAGE_OVERHEAD_TOKENS
+    for campo in campos:
+        if campo not in valores:
+            total += count_tokens(f"{{{{{campo}}}}}")
+    return total
+
+
+def count_filled_tokens(template: str, valores: Dict[str, str]) -> int:
+    # Parte fija + valores introducidos por el usuario (una vez por aparición)
+    total = _fixed_tokens(template, valores)
+    for campo in compile_template(template)[1]:
+        if campo in valores:
+            total += count_tokens(str(valores[campo]))
+    return total
+
+
+def truncate_values(template: str, valores: Dict[str, str], budget: int) -> Dict[str, str]:
+    # Reparte el presupuesto entre los valores sin tocar el texto de la plantilla:
+    # los valores cortos se quedan enteros y los largos se recortan al mismo límite.
+    campos = compile_template(template)[1]
+    apariciones = {campo: campos.count(campo) for campo in set(campos) if campo in valores}
+    longitudes = {campo: count_tokens(str(valores[campo])) for campo in apariciones}
+
+    resultado = dict(valores)
+    restante = budget
+    peso = sum(apariciones.values())
+    for campo in sorted(apariciones, key=longitudes.get):
+        n = apariciones[campo]
+        limite = min(longitudes[campo], restante // peso)
+        if limite < longitudes[campo]:
+            resultado[campo] = truncate_to_tokens(str(valores[campo]), limite)
+        restante -= n * limite
+        peso -= n
+    return resultado
+
+
+def output_budget(input_tokens: int) -> int:
+    return max(0, min(MAX_OUTPUT_TOKENS, CONTEXT_WINDOW - input_tokens))
+
+
+def request_max_tokens(info: Dict) -> Dict:
+    # Solo se limita la salida cuando el contexto restante es menor que el
+    # límite del modelo; si no, se deja el valor por defecto de la API.
+    if info["max_tokens"] < MAX_OUTPUT_TOKENS:
+        return {"max_tokens": info["max_tokens"]}
+    return {}
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * PRICE_INPUT_PER_M + output_tokens * PRICE_OUTPUT_PER_M) / 1_000_000
+
+
+def estimate(template: str, valores: Dict[str, str]) -> Dict:
+    input_tokens = count_filled_tokens(template, valores)
+    max_tokens = output_budget(input_tokens)
+    return {
+        "model": LLM_MODEL,
+        "input_tokens": input_tokens,
+        "max_input_tokens": MAX_INPUT_TOKENS,
+        "max_tokens": max_tokens,
+        "over_limit": input_tokens > MAX_INPUT_TOKENS,
+        "will_truncate": (
+            input_tokens > MAX_INPUT_TOKENS
+            and OVERFLOW_POLICY == "truncate"
+            and _fixed_tokens(template, valores) < MAX_INPUT_TOKENS
+        ),
+        "cost_input": round(estimate_cost(input_tokens, 0), 6),
+        "cost_max": round(estimate_cost(input_tokens, max_tokens), 6),
+    }
+
+
+def prepare_request(template: str, valores: Dict[str, str]) -> Tuple[str, Dict]:
+    # Devuelve el texto final a enviar y la estimación asociada.
+    # Con la política "truncate" se recortan solo los valores del usuario; si la
+    # plantilla por sí sola ya supera el límite, se rechaza igualmente.
+    info = estimate(template, valores)
+    if info["will_truncate"]:
+        budget = MAX_INPUT_TOKENS - _fixed_tokens(template, valores)
+        valores = truncate_values(template, valores, budget)
+        info = estimate(template, valores)
+        info["truncated"] = True
+    return fill_template(template, valores), info
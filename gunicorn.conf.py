@@ -0,0 +1,34 @@
+# Despliegue multi-worker con preload.
+#
+#   gunicorn -c gunicorn.conf.py
+#
+# El proceso maestro ejecuta app.main.preload() una sola vez (crea las tablas y
+# carga openai/tiktoken) y luego importa la app (preload_app). Los workers se
+# crean con fork y heredan esos módulos ya cargados, así que arrancan casi al
+# instante. Engine, cliente del LLM y entorno Jinja se crean dentro de cada
+# worker (lifespan / primer uso), nunca se comparten entre procesos.
+#
+# En hosts sin salida a internet, precargar la codificación de tiktoken en
+# TIKTOKEN_CACHE_DIR (ver app/tokens.py); si no, se usa la aproximación chars/4.
+#
+# Sin gunicorn, con uvicorn (los workers se lanzan con spawn, sin preload):
+#
+#   python -c "from app.main import preload; preload()"
+#   DB_CREATE_TABLES=false uvicorn app.main:create_app --factory --workers 4
+#
+# Benchmark de arranque: python scripts/bench_startup.py
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+wsgi_app = "app.main:create_app()"
+preload_app = True
+
+
+def on_starting(server):
+    from app.main import preload
+    preload()
+    # Los workers no vuelven a lanzar create_all
+    os.environ["DB_CREATE_TABLES"] = "false"
@@ -0,0 +1,55 @@
+"""Mide el tiempo de arranque de un worker: import de app.main + lifespan.
+
+Uso: python scripts/bench_startup.py [repeticiones]
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cada medición en un proceso nuevo para que no haya módulos en caché
+CHILD = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import create_app, lifespan
+t1 = time.perf_counter()
+app = create_app()
+async def boot():
+    async with lifespan(app):
+        pass
+asyncio.run(boot())
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "boot": t2 - t1, "total": t2 - t0}))
+"""
+
+
+def run_once(tmpdir):
+    # La base de datos del benchmark va a un directorio temporal, no a ./database.db
+    env = dict(os.environ, DB_ECHO="false", SQLITE_FILE=os.path.join(tmpdir, "bench.db"))
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    tmpdir = tempfile.mkdtemp()
+    try:
+        results = [run_once(tmpdir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    for key in ("import", "boot", "total"):
+        values = [r[key] * 1000 for r in results]
+        print(f"{key:>6}: mediana {statistics.median(values):7.1f} ms  "
+              f"min {min(values):7.1f} ms  max {max(values):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()